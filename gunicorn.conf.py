@@ -0,0 +1,33 @@
+# backend-python/gunicorn.conf.py
+# 실행: gunicorn main:app -c gunicorn.conf.py
+import multiprocessing
+import os
+
+# cpuset/affinity로 제한된 CPU 수 기준 (컨테이너에서 호스트 전체 코어 수를 쓰지 않도록)
+if hasattr(os, "sched_getaffinity"):
+    default_workers = len(os.sched_getaffinity(0))
+else:
+    default_workers = multiprocessing.cpu_count()
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+os.environ["WEB_CONCURRENCY"] = str(workers)  # 워커별 DALL-E 호출 한도 계산용 (main.py)
+worker_class = "uvicorn.workers.UvicornWorker"  # uvloop + httptools 자동 사용
+keepalive = 30
+loglevel = "warning"
+accesslog = None
+
+
+def pre_fork(server, worker):
+    """살아있는 워커가 가장 적게 쓰는 CPU를 골라 기록 (마스터에서 실행)"""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    in_use = [getattr(w, "cpu", None) for w in server.WORKERS.values()]
+    worker.cpu = min(cpus, key=in_use.count)
+
+
+def post_fork(server, worker):
+    """워커 프로세스를 pre_fork에서 고른 CPU 코어에 고정 (Linux 전용)"""
+    if hasattr(worker, "cpu"):
+        os.sched_setaffinity(0, {worker.cpu})
@@ -1,36 +1,256 @@
 # backend-python/main.py
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+from typing import Optional, List, Literal
 import random
 import os
+import asyncio
+from contextlib import suppress
+import time
+from datetime import datetime, timezone
+import hashlib
+import uuid
+import logging
+import orjson
+from array import array
 from dotenv import load_dotenv
 import openai
-from openai import OpenAI
-import requests
+from openai import AsyncOpenAI
+import httpx
+import aiofiles
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+from redis.commands.search.field import TagField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
 from io import BytesIO
 from pathlib import Path
 
 # 환경 변수 로드
 load_dotenv()
 
-# OpenAI 클라이언트 초기화 ✨
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+logger = logging.getLogger("artify")
+
+# 공용 HTTP 클라이언트 (HTTP/2 + keep-alive 커넥션 풀)
+# OpenAI API 호출과 이미지 다운로드가 같은 풀을 공유
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    http2=True
+)
+
+# API 키는 시작 시 1회만 확인
+API_KEY = os.getenv("OPENAI_API_KEY")
+if not API_KEY:
+    logger.error("❌ OPENAI_API_KEY가 설정되지 않았습니다. 이미지 생성이 비활성화됩니다.")
+
+# OpenAI 클라이언트 초기화 ✨ (비동기 - 이벤트 루프 블로킹 방지)
+# 재시도는 아래 generate_dalle_image에서 직접 처리
+# (키 없이 생성하면 예외가 발생하므로 키가 있을 때만 생성)
+client = AsyncOpenAI(
+    api_key=API_KEY,
+    http_client=http_client,
+    max_retries=0
+) if API_KEY else None
+
+# startup 시 미리 TLS 연결을 맺어둘 호스트 (OpenAI API + DALL-E 이미지 저장소)
+WARM_URLS = (
+    "https://api.openai.com",
+    "https://oaidalleapiprodscus.blob.core.windows.net",
+)
+# HTTP/1.1 호스트에만 적용 (HTTP/2 호스트는 커넥션 1개로 멀티플렉싱)
+WARM_CONNECTIONS = int(os.getenv("WARM_CONNECTIONS", 8))
+# 워밍업 요청은 짧은 타임아웃으로 (응답 없는 호스트가 있어도 금방 포기)
+WARM_TIMEOUT = httpx.Timeout(3.0)
+warm_task: Optional[asyncio.Task] = None
+
+# 텍스트 생성 마이크로 배칭 (BATCH_WAIT_MS 동안 최대 BATCH_MAX개 모아서 처리)
+BATCH_MAX = int(os.getenv("BATCH_MAX", 16))
+# Mock 단계에서는 모을 이유가 없으므로 대기 없이 이미 쌓인 요청만 합류 (실제 LLM 연동 시 20ms 정도 권장)
+BATCH_WAIT_MS = int(os.getenv("BATCH_WAIT_MS", 0))
+text_queue: Optional[asyncio.Queue] = None
+batch_task: Optional[asyncio.Task] = None
+
+# DALL-E 결과 캐시 (REDIS_URL 미설정 시 비활성화)
+# 1단계: 프롬프트+옵션 SHA-256 완전 일치 / 2단계: 임베딩 코사인 유사도 (RediSearch KNN)
+REDIS_URL = os.getenv("REDIS_URL")
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", 3000))  # DALL-E 이미지 URL은 약 1시간 후 만료
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+IMAGE_CACHE_PREFIX = "artify:img:"
+SEMANTIC_CACHE_PREFIX = "artify:img-sem:"
+SEMANTIC_CACHE_INDEX = "artify:img-sem-idx"
+redis_client: Optional[Redis] = None
+semantic_cache_enabled = False
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+
+class TokenBucket:
+    """초당 refill_per_sec개씩 채워지는 토큰 버킷 (RPM 제한 선제 대응)"""
+
+    def __init__(self, capacity: float, refill_per_sec: float, tokens: Optional[float] = None):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity if tokens is None else tokens
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.refill_per_sec
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.refill_per_sec)
+
+
+# DALL-E 호출 제한 (동시 요청 수 + 분당 요청 수)
+# 설정값은 서비스 전체 기준이므로 워커 프로세스 수로 나눠서 적용
+# (WEB_CONCURRENCY는 gunicorn.conf.py / __main__에서 워커에 전달)
+# 워커 간 상태 공유가 없으므로, 워커 수가 한도보다 많으면 워커별 최소치(동시 1건, 버킷 1토큰)
+# 때문에 전체 한도를 넘을 수 있음 → 시작 시 경고
+WORKER_COUNT = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+DALLE_RPM = int(os.getenv("DALLE_RPM", 5))
+DALLE_CONCURRENCY = int(os.getenv("DALLE_CONCURRENCY", 4))
+DALLE_MAX_RETRIES = int(os.getenv("DALLE_MAX_RETRIES", 3))
+WORKER_DALLE_RPM = DALLE_RPM / WORKER_COUNT
+if WORKER_COUNT > DALLE_CONCURRENCY or WORKER_COUNT > DALLE_RPM:
+    logger.warning(
+        "⚠️ 워커 수(%d)가 DALLE_CONCURRENCY(%d) 또는 DALLE_RPM(%d)보다 많아 "
+        "DALL-E 호출 한도는 워커별 근사치로만 적용됩니다.",
+        WORKER_COUNT, DALLE_CONCURRENCY, DALLE_RPM
+    )
+IMG_SEM = asyncio.Semaphore(max(1, DALLE_CONCURRENCY // WORKER_COUNT))
+# 시작 토큰은 워커 몫만큼만 (1 미만이면 채워질 때까지 대기) → 시작/재시작 직후 몰림 방지
+image_bucket = TokenBucket(
+    capacity=max(1.0, WORKER_DALLE_RPM),
+    refill_per_sec=WORKER_DALLE_RPM / 60,
+    tokens=WORKER_DALLE_RPM
+)
+
+
+DALLE_SERVER_ERROR_RETRIES = 2
+# 재시도 1회당 최대 대기 시간 (초) - 이보다 긴 Retry-After는 즉시 429로 반환
+DALLE_MAX_RETRY_WAIT = float(os.getenv("DALLE_MAX_RETRY_WAIT", 5))
+
+
+def backoff_delay(attempt: int) -> float:
+    """지수 백오프 + 지터 (DALLE_MAX_RETRY_WAIT 이내)"""
+    return min(2 ** attempt, DALLE_MAX_RETRY_WAIT) + random.random()
+
+
+def retry_delay(error: openai.APIStatusError, attempt: int) -> Optional[float]:
+    """
+    Retry-After 헤더가 있으면 그 값 + 지터, 없으면 지수 백오프 + 지터
+    Retry-After가 DALLE_MAX_RETRY_WAIT보다 길면 None (재시도하지 않음)
+    """
+    try:
+        retry_after = float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return backoff_delay(attempt)
+    if retry_after > DALLE_MAX_RETRY_WAIT:
+        return None
+    return retry_after + random.uniform(0, 0.5)
+
+
+async def with_retries(coro_fn, max_attempts: int = DALLE_MAX_RETRIES + 1):
+    """Rate Limit(429)과 서버 에러(5xx)에 한해 재시도"""
+    for attempt in range(max_attempts):
+        try:
+            return await coro_fn()
+        except openai.RateLimitError as e:
+            retry_limit = max_attempts - 1
+            if attempt == retry_limit:
+                raise
+            delay = retry_delay(e, attempt)
+            if delay is None:
+                raise
+        except openai.InternalServerError:
+            retry_limit = min(max_attempts - 1, DALLE_SERVER_ERROR_RETRIES)
+            if attempt == retry_limit:
+                raise
+            delay = backoff_delay(attempt)
+        logger.warning("⏳ DALL-E 재시도 %d/%d (%.1f초 후)", attempt + 1, retry_limit, delay)
+        await asyncio.sleep(delay)
+
+
+async def generate_dalle_image(**kwargs):
+    """동시성/속도 제한을 거쳐 DALL-E 호출 (재시도 대기 중에는 슬롯을 반납)"""
+    async def call():
+        async with IMG_SEM:
+            await image_bucket.acquire()
+            return await client.images.generate(**kwargs)
+
+    return await with_retries(call)
+
 
-app = FastAPI()
+@app.on_event("startup")
+async def startup():
+    global text_queue, batch_task, warm_task
+    # 외부 호스트 연결 여부와 관계없이 바로 기동되도록 백그라운드에서 실행
+    warm_task = asyncio.create_task(warm_connections())
+    GENERATED_IMAGE_DIR.mkdir(exist_ok=True)
+    await init_image_cache()
+    text_queue = asyncio.Queue()
+    batch_task = asyncio.create_task(batch_worker())
+
+async def warm_host(url: str):
+    """
+    먼저 커넥션 1개를 맺고, HTTP/1.1 호스트일 때만 WARM_CONNECTIONS개까지 추가로 맺음
+    (HTTP/2는 동시 요청이 같은 소켓을 공유하므로 추가 요청이 의미 없음)
+    응답 코드는 무시하고 커넥션만 풀에 남겨둠
+    """
+    try:
+        response = await http_client.head(url, timeout=WARM_TIMEOUT)
+    except httpx.HTTPError:
+        return
+    if response.http_version != "HTTP/2":
+        await asyncio.gather(
+            *(http_client.head(url, timeout=WARM_TIMEOUT) for _ in range(WARM_CONNECTIONS)),
+            return_exceptions=True
+        )
+
+async def warm_connections():
+    await asyncio.gather(*(warm_host(url) for url in WARM_URLS))
+
+@app.on_event("shutdown")
+async def shutdown():
+    warm_task.cancel()
+    batch_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await batch_task
+    await http_client.aclose()  # OpenAI 클라이언트도 같은 풀을 사용
+    if redis_client is not None:
+        await redis_client.aclose()
 
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3001"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization", "x-requested-with"],
+    max_age=86400,  # 브라우저가 preflight 결과를 하루 동안 캐시
 )
 
 # 기존 Pydantic 모델들...
 class AITextRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     brand_name: str
     product: str
     purpose: str = "promotion"
@@ -38,6 +258,8 @@ class AITextRequest(BaseModel):
     platform: str = "instagram"
 
 class PredictionRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     text: str
     has_image: bool = False
     hashtags: List[str] = []
@@ -45,58 +267,78 @@ class PredictionRequest(BaseModel):
 
 # AI 이미지 생성 요청 모델 ✨
 class AIImageRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     prompt: str
-    style: str = "vivid"  # vivid or natural
-    size: str = "1024x1024"  # 1024x1024, 1792x1024, 1024x1792
-    quality: str = "standard"  # standard or hd
+    style: Literal["vivid", "natural"] = "vivid"
+    size: Literal["1024x1024", "1792x1024", "1024x1792"] = "1024x1024"
+    quality: Literal["standard", "hd"] = "standard"
+
+# 이미지 저장 요청 모델 (긴 URL은 쿼리스트링 대신 body로 전달)
+class SaveImageRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    image_url: HttpUrl
+    filename: str = Field(pattern=r"^[\w\-][\w\-.]{0,127}$")  # 경로 구분자/숨김 파일 불가
+
+# DALL-E 3 이미지 1장당 비용 (USD)
+DALLE_COST = {"standard": 0.04, "hd": 0.08}
+
+# 고정 응답은 모듈 로드 시 1회만 직렬화
+# (Response 객체는 미들웨어가 헤더를 수정하므로 요청마다 새로 생성)
+ROOT_BODY = orjson.dumps({
+    "message": "Canva Clone AI Backend", 
+    "version": "2.0",
+    "features": ["AI Text Generation", "Analytics", "Image Generation"]
+})
 
 @app.get("/")
 async def root():
-    return {
-        "message": "Canva Clone AI Backend", 
-        "version": "2.0",
-        "features": ["AI Text Generation", "Analytics", "Image Generation"]
-    }
+    return Response(content=ROOT_BODY, media_type="application/json")
 
-@app.post("/api/ai/generate-text")
-async def generate_text(request: AITextRequest):
-    """AI 텍스트 생성 (Mock)"""
-    templates = {
-        "promotion": [
-            f"🎉 {request.brand_name}의 새로운 {request.product}! 지금 바로 만나보세요!",
-            f"✨ 특별한 순간을 위한 {request.product} - {request.brand_name}에서만!",
-            f"💝 {request.brand_name} {request.product}로 당신의 하루를 특별하게!"
-        ],
-        "announcement": [
-            f"📢 {request.brand_name}에서 {request.product}를 출시합니다!",
-            f"🆕 새로운 {request.product}가 찾아왔습니다 - {request.brand_name}",
-            f"🎊 {request.brand_name}의 {request.product}, 드디어 공개!"
-        ],
-        "engagement": [
-            f"💬 {request.product}에 대한 여러분의 생각은? - {request.brand_name}",
-            f"❤️ {request.brand_name} {request.product}, 어떻게 생각하시나요?",
-            f"🙋 {request.product} 좋아하시는 분? - {request.brand_name}"
-        ]
-    }
-    
-    hashtags_pool = [
-        f"#{request.brand_name.replace(' ', '')}",
-        f"#{request.product.replace(' ', '')}",
-        "#신제품", "#한정판", "#특별한날", "#데일리", "#추천"
+# 카피 템플릿 (모듈 로드 시 1회 생성, 요청마다 format만 수행)
+TEMPLATES = {
+    "promotion": (
+        "🎉 {brand}의 새로운 {product}! 지금 바로 만나보세요!",
+        "✨ 특별한 순간을 위한 {product} - {brand}에서만!",
+        "💝 {brand} {product}로 당신의 하루를 특별하게!"
+    ),
+    "announcement": (
+        "📢 {brand}에서 {product}를 출시합니다!",
+        "🆕 새로운 {product}가 찾아왔습니다 - {brand}",
+        "🎊 {brand}의 {product}, 드디어 공개!"
+    ),
+    "engagement": (
+        "💬 {product}에 대한 여러분의 생각은? - {brand}",
+        "❤️ {brand} {product}, 어떻게 생각하시나요?",
+        "🙋 {product} 좋아하시는 분? - {brand}"
+    )
+}
+
+STATIC_TAGS = ("#신제품", "#한정판", "#특별한날", "#데일리", "#추천")
+
+# 전역 random 대신 전용 인스턴스 사용
+text_rng = random.Random()
+
+def build_copies(request: AITextRequest) -> dict:
+    """요청 1건에 대한 카피 생성 (Mock)"""
+    base_texts = TEMPLATES.get(request.purpose, TEMPLATES["promotion"])
+    hashtags_pool = (
+        "#" + request.brand_name.replace(" ", ""),
+        "#" + request.product.replace(" ", ""),
+    ) + STATIC_TAGS
+    reasoning = f"{request.tone} 톤으로 {request.platform}에 최적화"
+
+    copies = [
+        {
+            "text": text.format(brand=request.brand_name, product=request.product),
+            "hashtags": text_rng.sample(hashtags_pool, 3),
+            "score": text_rng.randint(75, 95),
+            "reasoning": reasoning
+        }
+        for text in base_texts
     ]
-    
-    base_texts = templates.get(request.purpose, templates["promotion"])
-    
-    copies = []
-    for i, text in enumerate(base_texts):
-        selected_hashtags = random.sample(hashtags_pool, k=3)
-        copies.append({
-            "text": text,
-            "hashtags": selected_hashtags,
-            "score": random.randint(75, 95),
-            "reasoning": f"{request.tone} 톤으로 {request.platform}에 최적화"
-        })
-    
+
     return {
         "copies": copies,
         "metadata": {
@@ -106,19 +348,107 @@ async def generate_text(request: AITextRequest):
         }
     }
 
+async def generate_copies_batch(batch: List[AITextRequest]) -> List[dict]:
+    """
+    배치 단위 카피 생성
+    (실제 LLM 연동 시 prompt 리스트로 한 번에 호출하고 choice.index로 분배)
+    """
+    return [build_copies(request) for request in batch]
+
+def fail_futures(futures, error: Exception):
+    for future in futures:
+        if not future.done():
+            future.set_exception(error)
+
+async def collect_batch(batch: list):
+    """첫 요청을 받은 뒤 대기 중인 요청을 합류시키고, BATCH_WAIT_MS 동안 추가로 모음"""
+    batch.append(await text_queue.get())
+    while len(batch) < BATCH_MAX and not text_queue.empty():
+        batch.append(text_queue.get_nowait())
+    if BATCH_WAIT_MS <= 0:
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_WAIT_MS / 1000
+    while len(batch) < BATCH_MAX:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(text_queue.get(), timeout=timeout))
+        except asyncio.TimeoutError:
+            break
+
+async def batch_worker():
+    """큐에 쌓인 텍스트 요청을 모아서 한 번에 처리"""
+    batch = []
+    try:
+        while True:
+            batch = []
+            await collect_batch(batch)
+
+            try:
+                results = await generate_copies_batch([request for request, _ in batch])
+            except Exception as e:
+                fail_futures((future for _, future in batch), e)
+                continue
+
+            # 결과 수가 다르면 요청-결과 매칭을 신뢰할 수 없으므로 배치 전체를 실패 처리
+            if len(results) != len(batch):
+                error = RuntimeError(f"배치 결과 수 불일치: 요청 {len(batch)}건, 결과 {len(results)}건")
+                fail_futures((future for _, future in batch), error)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    except asyncio.CancelledError:
+        # 서버 종료 시 처리 중/대기 중인 요청이 멈춰 있지 않도록 실패 처리
+        pending = [future for _, future in batch]
+        while not text_queue.empty():
+            pending.append(text_queue.get_nowait()[1])
+        fail_futures(pending, HTTPException(status_code=503, detail="서버가 종료 중입니다."))
+        raise
+
+@app.post("/api/ai/generate-text")
+async def generate_text(request: AITextRequest):
+    """AI 텍스트 생성 (Mock, 마이크로 배칭)"""
+    future = asyncio.get_running_loop().create_future()
+    await text_queue.put((request, future))
+    return await future
+
+TRENDING_BODY = orjson.dumps({
+    "trending_topics": [
+        {"keyword": "여름시즌", "volume": 125000, "growth_rate": 45},
+        {"keyword": "한정판", "volume": 98000, "growth_rate": 32},
+        {"keyword": "신메뉴", "volume": 87000, "growth_rate": 28},
+        {"keyword": "이벤트", "volume": 76000, "growth_rate": 25},
+        {"keyword": "특가", "volume": 65000, "growth_rate": 18}
+    ],
+    "timestamp": "2025-10-27T12:00:00Z"
+})
+
 @app.get("/api/data/trending")
 async def get_trending():
     """트렌딩 데이터 (Mock)"""
-    return {
-        "trending_topics": [
-            {"keyword": "여름시즌", "volume": 125000, "growth_rate": 45},
-            {"keyword": "한정판", "volume": 98000, "growth_rate": 32},
-            {"keyword": "신메뉴", "volume": 87000, "growth_rate": 28},
-            {"keyword": "이벤트", "volume": 76000, "growth_rate": 25},
-            {"keyword": "특가", "volume": 65000, "growth_rate": 18}
-        ],
-        "timestamp": "2025-10-27T12:00:00Z"
+    return Response(content=TRENDING_BODY, media_type="application/json")
+
+# 성과 예측용 RNG 및 고정 추천 목록
+predict_rng = random.Random()
+RECOMMENDATIONS = (
+    {
+        "suggestion": "해시태그를 3-5개 사용하세요",
+        "impact": "참여율 +0.8%"
+    },
+    {
+        "suggestion": "이미지를 추가하세요",
+        "impact": "참여율 +1.2%"
+    },
+    {
+        "suggestion": "질문형 문장을 포함하세요",
+        "impact": "댓글 +25%"
     }
+)
 
 @app.post("/api/analytics/predict")
 async def predict_performance(request: PredictionRequest):
@@ -134,8 +464,8 @@ async def predict_performance(request: PredictionRequest):
         base_engagement += 0.5
         
     followers = 10000
-    estimated_reach = int(followers * (base_engagement / 100) * random.uniform(8, 12))
-    estimated_likes = int(estimated_reach * random.uniform(0.05, 0.08))
+    estimated_reach = int(followers * (base_engagement / 100) * predict_rng.uniform(8, 12))
+    estimated_likes = int(estimated_reach * predict_rng.uniform(0.05, 0.08))
     
     return {
         "predictions": {
@@ -148,44 +478,156 @@ async def predict_performance(request: PredictionRequest):
             "estimated_comments": int(estimated_likes * 0.1),
             "estimated_shares": int(estimated_likes * 0.05)
         },
-        "recommendations": [
-            {
-                "suggestion": "해시태그를 3-5개 사용하세요",
-                "impact": "참여율 +0.8%"
-            },
-            {
-                "suggestion": "이미지를 추가하세요",
-                "impact": "참여율 +1.2%"
-            },
-            {
-                "suggestion": "질문형 문장을 포함하세요",
-                "impact": "댓글 +25%"
-            }
-        ]
+        "recommendations": RECOMMENDATIONS
     }
 
+async def init_image_cache():
+    """Redis 연결 및 시맨틱 캐시 인덱스 준비 (RediSearch 미지원 시 완전 일치 캐시만 사용)"""
+    global redis_client, semantic_cache_enabled
+    if not REDIS_URL:
+        return
+
+    redis_client = Redis.from_url(REDIS_URL, decode_responses=True)
+    try:
+        await redis_client.ping()
+    except RedisError as e:
+        # 연결 불가 시 캐시 전체 비활성화 (요청마다 실패하는 왕복 방지)
+        logger.warning("⚠️ Redis 연결 실패, 이미지 캐시 비활성화: %s", e)
+        await redis_client.aclose()
+        redis_client = None
+        return
+
+    index = redis_client.ft(SEMANTIC_CACHE_INDEX)
+    try:
+        try:
+            await index.info()
+        except ResponseError:
+            await index.create_index(
+                [
+                    TagField("size"),
+                    TagField("quality"),
+                    TagField("style"),
+                    VectorField("emb", "FLAT", {
+                        "TYPE": "FLOAT32",
+                        "DIM": EMBEDDING_DIM,
+                        "DISTANCE_METRIC": "COSINE"
+                    })
+                ],
+                definition=IndexDefinition(
+                    prefix=[SEMANTIC_CACHE_PREFIX],
+                    index_type=IndexType.HASH
+                )
+            )
+        semantic_cache_enabled = True
+    except RedisError as e:
+        logger.warning("⚠️ 시맨틱 캐시 비활성화: %s", e)
+
+def image_cache_key(request: AIImageRequest) -> str:
+    raw = f"{request.prompt}|{request.size}|{request.quality}|{request.style}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+async def embed_prompt(prompt: str) -> bytes:
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=prompt)
+    return array("f", response.data[0].embedding).tobytes()
+
+async def lookup_image_cache(request: AIImageRequest, key: str):
+    """
+    캐시 조회 → (캐시된 결과 or None, 프롬프트 임베딩 or None)
+    캐시 장애 시에는 미스로 처리
+    """
+    try:
+        cached = await redis_client.get(IMAGE_CACHE_PREFIX + key)
+        if cached:
+            return orjson.loads(cached), None
+        if not semantic_cache_enabled:
+            return None, None
+
+        vec = await embed_prompt(request.prompt)
+        query = (
+            Query(
+                f"(@size:{{{request.size}}} @quality:{{{request.quality}}} @style:{{{request.style}}})"
+                "=>[KNN 1 @emb $vec AS dist]"
+            )
+            .return_fields("result", "dist")
+            .dialect(2)
+        )
+        res = await redis_client.ft(SEMANTIC_CACHE_INDEX).search(query, query_params={"vec": vec})
+        if res.docs and 1 - float(res.docs[0].dist) >= SEMANTIC_CACHE_THRESHOLD:
+            doc = res.docs[0]
+            # 같은 프롬프트 재요청은 완전 일치로 처리되도록 저장
+            # (원본 이미지 URL 만료 시점을 넘지 않게 남은 TTL 사용)
+            ttl = await redis_client.ttl(doc.id)
+            if ttl > 0:
+                await redis_client.setex(IMAGE_CACHE_PREFIX + key, ttl, doc.result)
+            return orjson.loads(doc.result), vec
+        return None, vec
+    except (RedisError, openai.APIError) as e:
+        logger.warning("⚠️ 이미지 캐시 조회 실패: %s", e)
+        return None, None
+
+async def store_image_cache(request: AIImageRequest, key: str, vec: Optional[bytes], result: dict):
+    try:
+        payload = orjson.dumps(result)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(IMAGE_CACHE_PREFIX + key, IMAGE_CACHE_TTL, payload)
+            if vec is not None:
+                pipe.hset(SEMANTIC_CACHE_PREFIX + key, mapping={
+                    "size": request.size,
+                    "quality": request.quality,
+                    "style": request.style,
+                    "emb": vec,
+                    "result": payload
+                })
+                pipe.expire(SEMANTIC_CACHE_PREFIX + key, IMAGE_CACHE_TTL)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("⚠️ 이미지 캐시 저장 실패: %s", e)
+
+def cached_image_response(request: AIImageRequest, cached: dict) -> dict:
+    """
+    캐시 결과 응답 (API 호출이 없었으므로 비용 0 + cached 표시)
+    유사 프롬프트로 매칭된 경우 revised_prompt는 원래 프롬프트 기준이므로 matched_prompt로 함께 전달
+    """
+    result = {
+        **cached,
+        "prompt": request.prompt,
+        "cached": True,
+        "meta": {**cached["meta"], "cost": 0}
+    }
+    if cached["prompt"] != request.prompt:
+        result["matched_prompt"] = cached["prompt"]
+    return result
+
 # ✨ DALL-E 3 이미지 생성 (실제 API 연동)
 @app.post("/api/ai/generate-image")
 async def generate_image(request: AIImageRequest):
     """
     DALL-E 3를 사용한 AI 이미지 생성
     """
+    # API 키 확인
+    if not API_KEY:
+        raise HTTPException(
+            status_code=500, 
+            detail="OpenAI API 키가 설정되지 않았습니다."
+        )
+    
     try:
-        # API 키 확인
-        if not os.getenv("OPENAI_API_KEY"):
-            raise HTTPException(
-                status_code=500, 
-                detail="OpenAI API 키가 설정되지 않았습니다."
-            )
+        # 캐시 확인 (동일/유사 프롬프트면 DALL-E 호출 생략)
+        cache_key = image_cache_key(request)
+        prompt_vec = None
+        if redis_client is not None:
+            cached, prompt_vec = await lookup_image_cache(request, cache_key)
+            if cached:
+                return cached_image_response(request, cached)
         
         # 프롬프트 최적화 (영어로 변환 - 더 나은 결과)
         # 실제로는 번역 API 사용하거나 영어 프롬프트 권장
         optimized_prompt = request.prompt
         
         # DALL-E 3 API 호출 ✨
-        print(f"🎨 이미지 생성 시작: {optimized_prompt[:50]}...")
+        logger.info("🎨 이미지 생성 시작: %.50s...", optimized_prompt)
         
-        response = client.images.generate(
+        response = await generate_dalle_image(
             model="dall-e-3",
             prompt=optimized_prompt,
             size=request.size,
@@ -197,9 +639,9 @@ async def generate_image(request: AIImageRequest):
         image_url = response.data[0].url
         revised_prompt = response.data[0].revised_prompt
         
-        print(f"✅ 이미지 생성 완료: {image_url}")
+        logger.info("✅ 이미지 생성 완료: %s", image_url)
         
-        return {
+        result = {
             "success": True,
             "image_url": image_url,
             "prompt": request.prompt,
@@ -209,59 +651,73 @@ async def generate_image(request: AIImageRequest):
             "quality": request.quality,
             "meta": {
                 "model": "dall-e-3",
-                "cost": 0.04 if request.quality == "standard" else 0.08,
+                "cost": DALLE_COST[request.quality],
                 "currency": "USD"
             }
         }
         
-    except openai.APIError as e:
-        print(f"❌ OpenAI API 에러: {e}")
-        raise HTTPException(status_code=500, detail=f"OpenAI API 에러: {str(e)}")
-    
+        if redis_client is not None:
+            await store_image_cache(request, cache_key, prompt_vec, result)
+        
+        return result
+        
     except openai.RateLimitError as e:
-        print(f"❌ Rate Limit 초과: {e}")
+        logger.error("❌ Rate Limit 초과: %s", e)
         raise HTTPException(status_code=429, detail="API 호출 한도를 초과했습니다. 잠시 후 다시 시도해주세요.")
     
     except openai.AuthenticationError as e:
-        print(f"❌ 인증 실패: {e}")
+        logger.error("❌ 인증 실패: %s", e)
         raise HTTPException(status_code=401, detail="OpenAI API 키가 유효하지 않습니다.")
     
+    except openai.APIError as e:
+        logger.error("❌ OpenAI API 에러: %s", e)
+        raise HTTPException(status_code=500, detail=f"OpenAI API 에러: {str(e)}")
+    
     except Exception as e:
-        print(f"❌ 예상치 못한 에러: {e}")
+        logger.exception("❌ 예상치 못한 에러: %s", e)
         raise HTTPException(status_code=500, detail=f"이미지 생성 실패: {str(e)}")
 
 
-        # Health check endpoint 추가 (기존 코드 아래에)
+# Health check endpoint (응답은 1초 단위로 재사용)
+_last_health = {"ts": 0.0, "body": b""}
+
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "service": "artify-python-backend"
-    }
+    now = time.time()
+    if now - _last_health["ts"] >= 1.0:
+        _last_health["ts"] = now
+        _last_health["body"] = orjson.dumps({
+            "status": "healthy",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "service": "artify-python-backend"
+        })
+    return Response(content=_last_health["body"], media_type="application/json")
 
 
 # ✨ 이미지 다운로드 및 저장 (선택사항)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+GENERATED_IMAGE_DIR = Path("generated_images")
+
 @app.post("/api/ai/save-generated-image")
-async def save_generated_image(image_url: str, filename: str):
+async def save_generated_image(request: SaveImageRequest):
     """
     생성된 이미지를 로컬에 저장
     (선택사항 - 영구 저장이 필요한 경우)
     """
+    # 저장 경로 설정 (파일명만 사용 - generated_images 밖으로 벗어나지 않도록)
+    filename = Path(request.filename).name
+    save_path = GENERATED_IMAGE_DIR / filename
+    # 다운로드 중에는 임시 파일에 기록하고 완료 후 교체 (실패 시 잘린 파일 방지 + 기존 파일 보존)
+    tmp_path = GENERATED_IMAGE_DIR / f".{filename}.{uuid.uuid4().hex}.part"
+    
     try:
-        # 이미지 다운로드
-        response = requests.get(image_url)
-        response.raise_for_status()
-        
-        # 저장 경로 설정
-        save_dir = Path("generated_images")
-        save_dir.mkdir(exist_ok=True)
-        
-        save_path = save_dir / filename
-        
-        # 이미지 저장
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+        # 이미지 다운로드 → 청크 단위로 바로 저장 (전체 이미지를 메모리에 올리지 않음)
+        async with http_client.stream("GET", str(request.image_url)) as response:
+            response.raise_for_status()
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+        os.replace(tmp_path, save_path)
         
         return {
             "success": True,
@@ -271,10 +727,29 @@ async def save_generated_image(image_url: str, filename: str):
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"이미지 저장 실패: {str(e)}")
+    
+    finally:
+        tmp_path.unlink(missing_ok=True)  # 성공 시에는 이미 교체되어 없음
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # gunicorn.conf.py와 동일하게 affinity로 허용된 CPU 수 기준
+    if hasattr(os, "sched_getaffinity"):
+        default_workers = len(os.sched_getaffinity(0))
+    else:
+        default_workers = os.cpu_count()
+    workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+    os.environ["WEB_CONCURRENCY"] = str(workers)  # 워커별 DALL-E 호출 한도 계산용
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        log_level="warning",
+        access_log=False
+    )
 
 